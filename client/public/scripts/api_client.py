@@ -22,12 +22,18 @@ Uso:
 
 import json
 import os
+import time
 import urllib.request
 import urllib.parse
 import urllib.error
 from typing import Any, Dict, List, Optional
 from datetime import datetime
 
+# Cache settings per processo: task_validation e gli script di assegnazione
+# richiedono /api/settings più volte nello stesso run
+SETTINGS_CACHE_TTL_SECONDS = 60
+_settings_cache: Dict[str, Any] = {"t": 0.0, "data": None}
+
 
 class ApiClient:
     """Client per API REST del backend."""
@@ -47,7 +53,7 @@ class ApiClient:
         try:
             req = urllib.request.Request(url, method='GET')
             with urllib.request.urlopen(req, timeout=self.timeout) as response:
-                return json.loads(response.read().decode('utf-8'))
+                return json.loads(response.read())
         except urllib.error.HTTPError as e:
             print(f"❌ Errore API GET {endpoint}: HTTP {e.code}")
             raise
@@ -67,7 +73,7 @@ class ApiClient:
                 method='POST'
             )
             with urllib.request.urlopen(req, timeout=self.timeout) as response:
-                return json.loads(response.read().decode('utf-8'))
+                return json.loads(response.read())
         except urllib.error.HTTPError as e:
             print(f"❌ Errore API POST {endpoint}: HTTP {e.code}")
             raise
@@ -87,7 +93,7 @@ class ApiClient:
                 method='PUT'
             )
             with urllib.request.urlopen(req, timeout=self.timeout) as response:
-                return json.loads(response.read().decode('utf-8'))
+                return json.loads(response.read())
         except urllib.error.HTTPError as e:
             print(f"❌ Errore API PUT {endpoint}: HTTP {e.code}")
             raise
@@ -376,9 +382,15 @@ def load_selected_cleaners_from_api(date: str) -> List[Dict]:
     return client.get_selected_cleaners(date)
 
 def load_settings_from_api() -> Dict:
-    """Wrapper per compatibilità - carica settings da PostgreSQL."""
+    """Wrapper per compatibilità - carica settings da PostgreSQL (cache per processo)."""
+    now = time.monotonic()
+    if _settings_cache["data"] is not None and now - _settings_cache["t"] <= SETTINGS_CACHE_TTL_SECONDS:
+        return _settings_cache["data"]
+
     client = ApiClient()
-    return client.get_settings()
+    _settings_cache["data"] = client.get_settings()
+    _settings_cache["t"] = now
+    return _settings_cache["data"]
 
 def load_client_timewindows_from_api() -> Dict:
     """Wrapper per compatibilità - carica finestre temporali da PostgreSQL."""
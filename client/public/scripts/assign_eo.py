@@ -1,6 +1,6 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
-import json, math, argparse
+import json, math, argparse, sys
 from dataclasses import dataclass, field
 from typing import Any, Dict, List, Optional, Tuple
 from pathlib import Path
@@ -294,6 +294,12 @@ def travel_minutes_raw(lat1: float, lng1: float, lat2: float, lng2: float) -> fl
     return max(MIN_TRAVEL, min(MAX_TRAVEL, total_time))
 
 
+# Matrice dei tempi di viaggio calcolata on-demand durante plan_day:
+# evaluate_route/can_add_task richiedono le stesse coppie di task
+# decine di volte per ogni inserimento candidato.
+_TRAVEL_CACHE: Dict[Tuple[str, str], float] = {}
+
+
 def travel_minutes(a: Optional[Task], b: Optional[Task]) -> float:
     """
     Modello realistico Milano urbano:
@@ -304,6 +310,15 @@ def travel_minutes(a: Optional[Task], b: Optional[Task]) -> float:
     if a is None or b is None:
         return 0.0
 
+    key = (a.task_id, b.task_id)
+    cached = _TRAVEL_CACHE.get(key)
+    if cached is None:
+        cached = _travel_minutes_uncached(a, b)
+        _TRAVEL_CACHE[key] = cached
+    return cached
+
+
+def _travel_minutes_uncached(a: Task, b: Task) -> float:
     # Stesso edificio: 3 minuti per cambio appartamento
     # (raccolta attrezzature, scale/ascensore, spostamento)
     if same_building(a.address, b.address):
@@ -581,7 +596,8 @@ def load_cleaners() -> List[Cleaner]:
     cleaners_data = load_cleaners_data()
     all_cleaners: List[Cleaner] = []
     for c in cleaners_data:
-        role = (c.get("role") or "Standard").strip()
+        # ruolo interned (chiave delle cache in task_validation)
+        role = sys.intern((c.get("role") or "Standard").strip())
         can_do_straordinaria = bool(c.get("can_do_straordinaria", False))
 
         # Valida se il cleaner può gestire Early-Out basandosi su settings
@@ -734,6 +750,9 @@ def plan_day(
     if assigned_logistic_codes is None:
         assigned_logistic_codes = set()
 
+    # Le coordinate possono cambiare tra un run e l'altro: matrice pulita
+    _TRAVEL_CACHE.clear()
+
     unassigned: List[Task] = []
 
     for task in tasks:
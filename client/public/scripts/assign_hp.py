@@ -1,6 +1,6 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
-import json, math, argparse
+import json, math, argparse, sys
 from dataclasses import dataclass, field
 from typing import Any, Dict, List, Optional, Tuple
 from pathlib import Path
@@ -671,7 +671,8 @@ def load_cleaners(ref_date: str) -> List[Cleaner]:
     data = load_cleaners_data()
     cleaners: List[Cleaner] = []
     for c in data:
-        role = (c.get("role") or "Standard").strip()
+        # ruolo interned (chiave delle cache in task_validation)
+        role = sys.intern((c.get("role") or "Standard").strip())
         can_do_straordinaria = bool(c.get("can_do_straordinaria", False))
 
         if not can_cleaner_handle_priority(role, "high_priority"):
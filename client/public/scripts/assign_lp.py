@@ -627,7 +627,8 @@ def load_cleaners() -> List[Cleaner]:
     data = load_cleaners_data()
     cleaners: List[Cleaner] = []
     for c in data:
-        role = (c.get("role") or "Standard").strip()
+        # ruolo interned (chiave delle cache in task_validation)
+        role = sys.intern((c.get("role") or "Standard").strip())
         can_do_straordinaria = bool(c.get("can_do_straordinaria", False))
 
         if not can_cleaner_handle_priority(role, "low_priority"):
@@ -1,11 +1,14 @@
 # -*- coding: utf-8 -*-
+import atexit
 import json
 import mysql.connector
+import os
 import sys
-from datetime import datetime, date, timedelta
+from datetime import datetime, timedelta
 from pathlib import Path
 import argparse
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 
 # ---------- Config ----------
 BASE_DIR = Path(__file__).parent.parent / "data"
@@ -45,12 +48,25 @@ DB_CONFIG = {
     "database": "adamdb",
 }
 
-# ---------- Utilità ----------
-def date_to_str(value):
-    if isinstance(value, (datetime, date)):
-        return value.strftime('%Y-%m-%d')
-    return value
+# Connessione MySQL condivisa dal run: operazioni, nomi e task usavano
+# ciascuno una connessione propria (handshake TCP+auth verso ADAM ogni volta)
+_DB_CONNECTION = None
+
+def get_db_connection():
+    global _DB_CONNECTION
+    if _DB_CONNECTION is None or not _DB_CONNECTION.is_connected():
+        _DB_CONNECTION = mysql.connector.connect(**DB_CONFIG)
+    return _DB_CONNECTION
+
+def close_db_connection():
+    global _DB_CONNECTION
+    if _DB_CONNECTION is not None:
+        _DB_CONNECTION.close()
+        _DB_CONNECTION = None
 
+atexit.register(close_db_connection)
+
+# ---------- Utilità ----------
 def varchar_to_str(value):
     if value is None:
         return None
@@ -58,11 +74,6 @@ def varchar_to_str(value):
     s = str(value).strip()
     return s if s else None
 
-def normalize_coord(coord):
-    if coord is None:
-        return None
-    return str(coord).replace(',', '.').strip()
-
 def parse_time(t):
     if not t:
         return None
@@ -71,13 +82,9 @@ def parse_time(t):
     except ValueError:
         return None
 
-def map_structure_type_to_letter(structure_type_id):
-    mapping = {1: "A", 2: "B", 3: "C", 4: "D", 5: "E", 6: "F"}
-    return mapping.get(structure_type_id, "X")
-
 # ---------- Operazioni attive ----------
 def get_active_operations():
-    connection = mysql.connector.connect(**DB_CONFIG)
+    connection = get_db_connection()
     cursor = connection.cursor(dictionary=True)
     cursor.execute("""
         SELECT id
@@ -86,7 +93,7 @@ def get_active_operations():
     """)
     results = cursor.fetchall()
     cursor.close()
-    connection.close()
+
     return [row['id'] for row in results]
 
 def get_operation_names(operation_ids):
@@ -94,7 +101,7 @@ def get_operation_names(operation_ids):
     if not operation_ids:
         return {}
 
-    connection = mysql.connector.connect(**DB_CONFIG)
+    connection = get_db_connection()
     cursor = connection.cursor(dictionary=True)
 
     placeholders = ','.join(['%s'] * len(operation_ids))
@@ -107,7 +114,6 @@ def get_operation_names(operation_ids):
     cursor.execute(query, operation_ids)
     results = cursor.fetchall()
     cursor.close()
-    connection.close()
 
     # Crea dizionario id -> nome
     operation_names = {}
@@ -116,6 +122,17 @@ def get_operation_names(operation_ids):
 
     return operation_names
 
+def write_json_file(path: Path, data) -> None:
+    """Scrive data come JSON indentato in path.
+
+    Scrittura su file temporaneo + os.replace: la UI legge operations.json per i
+    nomi delle operazioni e non vede mai un JSON parziale.
+    """
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=4, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
 def save_operations_to_file(operation_ids):
     # Recupera i nomi delle operazioni
     operation_names_map = get_operation_names(operation_ids)
@@ -134,91 +151,106 @@ def save_operations_to_file(operation_ids):
         "total_operations": len(operation_ids)
     }
     ops_file = INPUT_DIR / "operations.json"
-    with open(ops_file, "w", encoding="utf-8") as f:
-        json.dump(operations_data, f, indent=4, ensure_ascii=False)
+    write_json_file(ops_file, operations_data)
     print(f"Salvati {len(operation_ids)} operation_id validi in {ops_file}")
 
 # ---------- Estrazione task dal DB ----------
-def get_tasks_from_db(selected_date, assigned_task_ids=None):
-    if assigned_task_ids is None:
-        assigned_task_ids = set()
-
+# Query task hoistata a livello di modulo: il testo è fisso e viene eseguito
+# come prepared statement (parse/plan una volta, parametri in binario)
+# Coordinate normalizzate, date 'YYYY-MM-DD' e lettera del tipo appartamento
+# arrivano già pronte da MySQL: nessuna conversione Python per riga
+TASKS_QUERY = """
+    SELECT 
+        h.id AS task_id,
+        s.logistic_code AS logistic_code,
+        s.customer_id AS client_id,
+        s.premium AS premium,
+        s.address1 AS address,
+        REPLACE(TRIM(s.lat), ',', '.') AS lat,
+        REPLACE(TRIM(s.lng), ',', '.') AS lng,
+        ast.duration_minutes AS cleaning_time,
+        CAST(DATE(h.checkin) AS CHAR) AS checkin,
+        CAST(DATE(h.checkout) AS CHAR) AS checkout,
+        h.checkin_time,
+        h.checkout_time,
+        h.checkin_pax AS pax_in,
+        h.checkout_pax AS pax_out,
+        s.structure_type_id,
+        h.operation_id,
+        c.alias AS alias,
+        c.name AS customer_name,
+        s.customer_structure_reference AS customer_reference,
+        COALESCE(ELT(s.structure_type_id, 'A', 'B', 'C', 'D', 'E', 'F'), 'X') AS type_apt
+    FROM app_housekeeping h
+    JOIN app_structures s ON h.structure_id = s.id
+    LEFT JOIN app_customers c ON s.customer_id = c.id
+    -- Timing del contratto più recente per (tipo struttura, cliente, operazione):
+    -- un'unica JOIN invece di una subquery correlata rieseguita per ogni riga
+    LEFT JOIN (
+        SELECT
+            structure_type_id,
+            customer_id,
+            structure_operation_id,
+            duration_minutes,
+            ROW_NUMBER() OVER (
+                PARTITION BY structure_type_id, customer_id, structure_operation_id
+                ORDER BY ABS(DATEDIFF(data_contratto, CURDATE()))
+            ) AS rn
+        FROM app_structure_timings
+        WHERE data_contratto <= CURDATE()
+          AND deleted_at IS NULL
+    ) ast ON ast.structure_type_id = s.structure_type_id
+         AND ast.customer_id = s.customer_id
+         AND ast.structure_operation_id = (
+             CASE WHEN h.operation_id = 0 THEN 2 ELSE h.operation_id END
+         )
+         AND ast.rn = 1
+    -- Filtro coperto da idx_hk_checkout_active
+    -- (vedi scripts/create-adam-housekeeping-index.ts)
+    WHERE h.checkout = %s
+      AND h.deleted_at IS NULL
+      AND h.deleted_at_client IS NULL
+      AND s.lat IS NOT NULL AND s.lng IS NOT NULL
+      AND s.lat != '' AND s.lng != ''
+      AND s.lat != '0' AND s.lng != '0'
+      -- Operazioni attive filtrate lato DB (stesso criterio di get_active_operations):
+      -- niente lista IN di lunghezza variabile, il testo della query resta costante
+      AND (
+          h.operation_id IS NULL
+          OR h.operation_id = 0
+          OR EXISTS (
+              SELECT 1 FROM app_structure_operation o
+              WHERE o.id = h.operation_id AND o.active = 1 AND o.enable_wass = 1
+          )
+      )
+"""
+
+def iter_tasks_from_db(selected_date):
+    """Genera le task del giorno una alla volta, in streaming dal cursore MySQL."""
     print(f"Aggiorno la lista delle operazioni attive dal DB...")
-    ops = get_active_operations()
-    save_operations_to_file(ops)
-
-    valid_operation_ids = ops + [0, None]
-    non_null_operation_ids = [op for op in valid_operation_ids if op is not None]
-    operation_placeholders = ','.join(['%s'] * len(non_null_operation_ids)) if non_null_operation_ids else 'NULL'
-
-    connection = mysql.connector.connect(**DB_CONFIG)
-    cursor = connection.cursor(dictionary=True)
+    save_operations_to_file(get_active_operations())
 
-    base_query = f"""
-        SELECT 
-            h.id AS task_id,
-            s.logistic_code AS logistic_code,
-            s.customer_id AS client_id,
-            s.premium AS premium,
-            s.address1 AS address,
-            s.lat,
-            s.lng,
-            (
-                SELECT duration_minutes 
-                FROM app_structure_timings ast
-                WHERE ast.structure_type_id = s.structure_type_id
-                    AND ast.customer_id = s.customer_id
-                    AND ast.structure_operation_id = (
-                        CASE WHEN h.operation_id = 0 THEN 2 ELSE h.operation_id END
-                    )
-                    AND ast.data_contratto <= CURDATE()
-                    AND ast.deleted_at IS NULL
-                ORDER BY ABS(DATEDIFF(ast.data_contratto, CURDATE()))
-                LIMIT 1
-            ) AS cleaning_time,
-            h.checkin,
-            h.checkout,
-            h.checkin_time,
-            h.checkout_time,
-            h.checkin_pax AS pax_in,
-            h.checkout_pax AS pax_out,
-            s.structure_type_id,
-            h.operation_id,
-            c.alias AS alias,
-            c.name AS customer_name,
-            s.customer_structure_reference AS customer_reference
-        FROM app_housekeeping h
-        JOIN app_structures s ON h.structure_id = s.id
-        LEFT JOIN app_customers c ON s.customer_id = c.id
-        WHERE h.checkout = %s
-          AND h.deleted_at IS NULL
-          AND h.deleted_at_client IS NULL
-          AND s.lat IS NOT NULL AND s.lng IS NOT NULL
-          AND s.lat != '' AND s.lng != ''
-          AND s.lat != '0' AND s.lng != '0'
-    """
+    connection = get_db_connection()
+    # Cursore prepared a tuple, non bufferizzato: le righe arrivano in streaming
+    # da MySQL senza materializzare un dict per riga (l'ordine segue la SELECT)
+    cursor = connection.cursor(prepared=True)
 
-    params = [selected_date]
-    if non_null_operation_ids:
-        base_query += f" AND (h.operation_id IN ({operation_placeholders}) OR h.operation_id IS NULL OR h.operation_id = 0)"
-        params += non_null_operation_ids
+    cursor.execute(TASKS_QUERY, (selected_date,))
 
-    cursor.execute(base_query, params)
-    rows = cursor.fetchall()
-    cursor.close()
-    connection.close()
+    try:
+        yield from _build_task_items(cursor)
+    finally:
+        cursor.close()
 
-    results = []
-    filtered_count = 0
-    for r in rows:
-        task_id = r.get("task_id")
+# Valori di s.premium considerati "premium" (il driver può restituire int o stringa)
+_PREMIUM_TRUTHY = frozenset({1, "1"})
 
-        # Filtra task già assegnate
-        if task_id and task_id in assigned_task_ids:
-            filtered_count += 1
-            continue
-        structure_type_id = r.get("structure_type_id")
-        op_id = r.get("operation_id")
+def _build_task_items(cursor):
+    premium_truthy = _PREMIUM_TRUTHY
+    for (task_id, logistic_code, client_id, premium, address, lat, lng,
+         cleaning_time, checkin, checkout, checkin_time, checkout_time,
+         pax_in, pax_out, structure_type_id, op_id, alias, customer_name,
+         customer_reference, type_apt) in cursor:
 
         if op_id == 0:
             confirmed_operation = False
@@ -227,34 +259,45 @@ def get_tasks_from_db(selected_date, assigned_task_ids=None):
             confirmed_operation = True
             output_operation_id = op_id
 
-        premium_bool = True if r.get("premium") in (1, True, "1") else False
-        straordinaria_bool = True if output_operation_id == 3 else False
-        small_equipment_bool = True if structure_type_id == 1 else False
-
         item = {
-            "task_id": r.get("task_id"),
-            "logistic_code": r.get("logistic_code"),
-            "client_id": r.get("client_id"),
-            "premium": premium_bool,
-            "address": r.get("address"),
-            "lat": normalize_coord(r.get("lat")),
-            "lng": normalize_coord(r.get("lng")),
-            "cleaning_time": r.get("cleaning_time"),
-            "checkin_date": date_to_str(r.get("checkin")) if r.get("checkin") else None,
-            "checkout_date": date_to_str(r.get("checkout")) if r.get("checkout") else None,
-            "checkin_time": varchar_to_str(r.get("checkin_time")),
-            "checkout_time": varchar_to_str(r.get("checkout_time")),
-            "pax_in": r.get("pax_in"),
-            "pax_out": r.get("pax_out"),
-            "small_equipment": small_equipment_bool,
+            "task_id": task_id,
+            "logistic_code": logistic_code,
+            "client_id": client_id,
+            "premium": premium in premium_truthy,
+            "address": address,
+            "lat": lat,
+            "lng": lng,
+            "cleaning_time": cleaning_time,
+            "checkin_date": checkin,
+            "checkout_date": checkout,
+            "checkin_time": varchar_to_str(checkin_time),
+            "checkout_time": varchar_to_str(checkout_time),
+            "pax_in": pax_in,
+            "pax_out": pax_out,
+            "small_equipment": structure_type_id == 1,
             "operation_id": output_operation_id,
             "confirmed_operation": confirmed_operation,
-            "straordinaria": straordinaria_bool,
-            "type_apt": map_structure_type_to_letter(structure_type_id),
-            "alias": varchar_to_str(r.get("alias")) if r.get("alias") is not None else None,
-            "customer_name": varchar_to_str(r.get("customer_name")) if r.get("customer_name") is not None else None,
-            "customer_reference": varchar_to_str(r.get("customer_reference")) if r.get("client_id") == 3 and r.get("customer_reference") is not None else None,
+            "straordinaria": output_operation_id == 3,
+            "type_apt": type_apt,
+            "alias": varchar_to_str(alias),
+            "customer_name": varchar_to_str(customer_name),
+            "customer_reference": varchar_to_str(customer_reference) if client_id == 3 else None,
         }
+        yield item
+
+def get_tasks_from_db(selected_date, assigned_task_ids=None):
+    if assigned_task_ids is None:
+        assigned_task_ids = set()
+
+    results = []
+    filtered_count = 0
+    for item in iter_tasks_from_db(selected_date):
+        task_id = item["task_id"]
+
+        # Filtra task già assegnate
+        if task_id and task_id in assigned_task_ids:
+            filtered_count += 1
+            continue
         results.append(item)
 
     if filtered_count > 0:
@@ -508,15 +551,22 @@ def main():
 
     # Aggiorna operations.json
     print("Aggiorno la lista delle operazioni attive dal DB...")
-    subprocess.run(["python3", str(EXTRACT_ACTIVE_CLIENTS_SCRIPT), "--date", target_date], check=True)
+    extract_commands = [["python3", str(EXTRACT_ACTIVE_CLIENTS_SCRIPT), "--date", target_date]]
 
     # Estrai i cleaners per la data target SOLO se non usiamo dati salvati
     if not args.skip_extract:
         print("Estraggo i cleaners dal database...")
-        subprocess.run(["python3", str(EXTRACT_CLEANERS_SCRIPT), "--date", target_date], check=True)
+        extract_commands.append(["python3", str(EXTRACT_CLEANERS_SCRIPT), "--date", target_date])
     else:
         print("⏭️ Salto estrazione cleaners (--skip-extract attivo), uso selected_cleaners.json esistente")
 
+    # Gli estrattori sono processi indipendenti (ognuno con la propria connessione
+    # ad ADAM): eseguiti in parallelo la latenza di rete si sovrappone
+    with ThreadPoolExecutor(max_workers=len(extract_commands)) as executor:
+        futures = [executor.submit(subprocess.run, cmd, check=True) for cmd in extract_commands]
+        for future in futures:
+            future.result()
+
 
     # Leggi timeline da API per aggiornare i dati delle task assegnate
     assigned_task_ids = set()
@@ -536,11 +586,18 @@ def main():
         print(f"⚠️ Errore lettura timeline da API: {e}")
 
     # Estrai TUTTE le task dal database (anche quelle assegnate per aggiornarle)
-    all_tasks_from_db = get_tasks_from_db(target_date, assigned_task_ids=set())  # Non filtrare
+    # in un solo passaggio sullo stream: mappa per la timeline + lista per i containers
+    db_tasks_map = {}
+    all_tasks = []
+    for task in iter_tasks_from_db(target_date):
+        task_id = task["task_id"]
+        if task_id in assigned_task_ids:
+            db_tasks_map[task_id] = task
+        else:
+            all_tasks.append(task)
 
     # CRITICAL: Preserva timeline.json aggiornando SOLO i dati modificati dal DB
     if timeline_data and assigned_task_ids:
-        db_tasks_map = {task["task_id"]: task for task in all_tasks_from_db}
         updated_count = 0
 
         for cleaner_entry in timeline_data.get("cleaners_assignments", []):
@@ -572,9 +629,6 @@ def main():
             api_client.save_timeline(target_date, timeline_data)
             print(f"✅ Aggiornate {updated_count} task in timeline via API (preservati campi timeline: start_time, end_time, travel_time, sequence)")
 
-    # Filtra le task già assegnate per containers.json
-    all_tasks = [t for t in all_tasks_from_db if t["task_id"] not in assigned_task_ids]
-
     # Classifica task (senza deduplica - le task duplicate rimangono visibili)
     print(f"🔄 Classificazione task in containers...")
     early_out, high_priority, low_priority = classify_tasks(all_tasks, target_date, use_api=True)
@@ -624,146 +678,12 @@ def extract_tasks_from_db(work_date=None, assigned_task_ids=None):
     Ritorna una lista di task con tutti i campi necessari
     Esclude le task già assegnate nella timeline
     """
-    import os
-    from dotenv import load_dotenv
-    import psycopg2
-    from datetime import datetime
-
-    if assigned_task_ids is None:
-        assigned_task_ids = set()
-
-    # Carica variabili d'ambiente
-    load_dotenv()
-
-    # Connessione al database
-    conn = psycopg2.connect(
-        host=os.getenv("DB_HOST"),
-        database=os.getenv("DB_NAME"),
-        user=os.getenv("DB_USER"),
-        password=os.getenv("DB_PASSWORD"),
-        port=os.getenv("DB_PORT")
-    )
-
-    cursor = conn.cursor()
-
     # Se non specificata, usa la data corrente
     if work_date is None:
         work_date = datetime.now().strftime("%Y-%m-%d")
 
     print(f"📋 Estrazione task dal database per {work_date}...")
-
-    # Ottieni le operation_ids attive
-    ops = get_active_operations()
-    save_operations_to_file(ops)
-
-    valid_operation_ids = ops + [0, None]
-    non_null_operation_ids = [op for op in valid_operation_ids if op is not None]
-    operation_placeholders = ','.join(['%s'] * len(non_null_operation_ids)) if non_null_operation_ids else 'NULL'
-
-    base_query = f"""
-        SELECT 
-            h.id AS task_id,
-            s.logistic_code AS logistic_code,
-            s.customer_id AS client_id,
-            s.premium AS premium,
-            s.address1 AS address,
-            s.lat,
-            s.lng,
-            (
-                SELECT duration_minutes 
-                FROM app_structure_timings ast
-                WHERE ast.structure_type_id = s.structure_type_id
-                    AND ast.customer_id = s.customer_id
-                    AND ast.structure_operation_id = (
-                        CASE WHEN h.operation_id = 0 THEN 2 ELSE h.operation_id END
-                    )
-                    AND ast.data_contratto <= CURDATE()
-                    AND ast.deleted_at IS NULL
-                ORDER BY ABS(DATEDIFF(ast.data_contratto, CURDATE()))
-                LIMIT 1
-            ) AS cleaning_time,
-            h.checkin,
-            h.checkout,
-            h.checkin_time,
-            h.checkout_time,
-            h.checkin_pax AS pax_in,
-            h.checkout_pax AS pax_out,
-            s.structure_type_id,
-            h.operation_id,
-            c.alias AS alias,
-            c.name AS customer_name,
-            s.customer_structure_reference AS customer_reference
-        FROM app_housekeeping h
-        JOIN app_structures s ON h.structure_id = s.id
-        LEFT JOIN app_customers c ON s.customer_id = c.id
-        WHERE h.checkout = %s
-          AND h.deleted_at IS NULL
-          AND h.deleted_at_client IS NULL
-          AND s.lat IS NOT NULL AND s.lng IS NOT NULL
-          AND s.lat != '' AND s.lng != ''
-          AND s.lat != '0' AND s.lng != '0'
-    """
-
-    params = [work_date]
-    if non_null_operation_ids:
-        base_query += f" AND (h.operation_id IN ({operation_placeholders}) OR h.operation_id IS NULL OR h.operation_id = 0)"
-        params += non_null_operation_ids
-
-    cursor.execute(base_query, params)
-    rows = cursor.fetchall()
-
-    tasks = []
-    for r in rows:
-        structure_type_id = r.get("structure_type_id")
-        op_id = r.get("operation_id")
-
-        if op_id == 0:
-            confirmed_operation = False
-            output_operation_id = 2
-        else:
-            confirmed_operation = True
-            output_operation_id = op_id
-
-        premium_bool = True if r.get("premium") in (1, True, "1") else False
-        straordinaria_bool = True if output_operation_id == 3 else False
-        small_equipment_bool = True if structure_type_id == 1 else False
-
-        item = {
-            "task_id": r.get("task_id"),
-            "logistic_code": r.get("logistic_code"),
-            "client_id": r.get("client_id"),
-            "premium": premium_bool,
-            "address": r.get("address"),
-            "lat": normalize_coord(r.get("lat")),
-            "lng": normalize_coord(r.get("lng")),
-            "cleaning_time": r.get("cleaning_time"),
-            "checkin_date": date_to_str(r.get("checkin")) if r.get("checkin") else None,
-            "checkout_date": date_to_str(r.get("checkout")) if r.get("checkout") else None,
-            "checkin_time": varchar_to_str(r.get("checkin_time")),
-            "checkout_time": varchar_to_str(r.get("checkout_time")),
-            "pax_in": r.get("pax_in"),
-            "pax_out": r.get("pax_out"),
-            "small_equipment": small_equipment_bool,
-            "operation_id": output_operation_id,
-            "confirmed_operation": confirmed_operation,
-            "straordinaria": straordinaria_bool,
-            "type_apt": map_structure_type_to_letter(structure_type_id),
-            "alias": varchar_to_str(r.get("alias")) if r.get("alias") is not None else None,
-            "customer_name": varchar_to_str(r.get("customer_name")) if r.get("customer_name") is not None else None,
-        }
-        tasks.append(item)
-
-    cursor.close()
-    conn.close()
-
-    # Filtra task già assegnate
-    if assigned_task_ids:
-        original_count = len(tasks)
-        tasks = [t for t in tasks if t["task_id"] not in assigned_task_ids]
-        filtered_count = original_count - len(tasks)
-        if filtered_count > 0:
-            print(f"✅ Filtrate {filtered_count} task già assegnate (rimangono {len(tasks)})")
-
+    tasks = get_tasks_from_db(work_date, assigned_task_ids)
     print(f"✅ Estratte {len(tasks)} task dal database")
     return tasks
 
@@ -94,12 +94,18 @@ def travel_minutes(lat1: float, lng1: float, lat2: float, lng2: float,
 
 def time_to_minutes(time_str: str) -> int:
     """Converte una stringa HH:MM in minuti dall'inizio della giornata."""
-    h, m = map(int, time_str.split(':'))
-    return h * 60 + m
+    h, _, m = time_str.partition(':')
+    return int(h) * 60 + int(m)
+
+
+# "HH:MM" precalcolate per 0..47:59 (i turni possono sforare la mezzanotte)
+_HHMM_TABLE = tuple(f"{m // 60:02d}:{m % 60:02d}" for m in range(48 * 60))
 
 
 def minutes_to_time(minutes: int) -> str:
     """Converte minuti dall'inizio della giornata in stringa HH:MM."""
+    if 0 <= minutes < len(_HHMM_TABLE):
+        return _HHMM_TABLE[minutes]
     h = minutes // 60
     m = minutes % 60
     return f"{h:02d}:{m:02d}"
@@ -268,7 +274,8 @@ def main():
     """Main entry point. Legge JSON da stdin per evitare ARG_MAX limit."""
     try:
         # Leggi sempre da stdin (evita ARG_MAX e command injection)
-        input_data = sys.stdin.read()
+        # Bytes grezzi: json.loads li decodifica da sé, senza il TextIOWrapper di stdin
+        input_data = sys.stdin.buffer.read()
         if not input_data:
             print(json.dumps({
                 "success": False,
@@ -285,7 +292,7 @@ def main():
         print(json.dumps({
             "success": True,
             "cleaner_data": updated_data
-        }, indent=2))
+        }))
 
     except Exception as e:
         print(json.dumps({
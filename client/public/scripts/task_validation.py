@@ -1,5 +1,6 @@
 import json
 import os
+from functools import lru_cache
 from typing import Optional
 
 # Funzione helper per caricare le impostazioni da API (PostgreSQL)
@@ -12,26 +13,96 @@ def load_settings(settings_path=None):
         print(f"Errore durante il caricamento delle impostazioni da API: {e}")
         return {}
 
+# Ruolo normalizzato -> chiave in settings['apartment_types']
+ROLE_APARTMENT_KEYS = {
+    'standard_cleaner': 'standard_apt',
+    'premium_cleaner': 'premium_apt',
+    'straordinario_cleaner': 'straordinario_apt',
+    'formatore_cleaner': 'formatore_apt',
+}
+
+PRIORITY_KEYS = ('early_out', 'high_priority', 'low_priority')
+
+# Valori di role così come arrivano da cleaners (e chiavi già normalizzate):
+# lookup diretto senza lower/strip/scansioni di sottostringhe
+_ROLE_MAP = {
+    'Standard': 'standard_cleaner',
+    'standard': 'standard_cleaner',
+    'standard_cleaner': 'standard_cleaner',
+    'Premium': 'premium_cleaner',
+    'premium': 'premium_cleaner',
+    'premium_cleaner': 'premium_cleaner',
+    'Straordinaria': 'straordinario_cleaner',
+    'straordinaria': 'straordinario_cleaner',
+    'Straordinario': 'straordinario_cleaner',
+    'straordinario': 'straordinario_cleaner',
+    'straordinario_cleaner': 'straordinario_cleaner',
+    'Formatore': 'formatore_cleaner',
+    'formatore': 'formatore_cleaner',
+    'formatore_cleaner': 'formatore_cleaner',
+}
+
+def normalize_cleaner_role(role: str) -> str:
+    """Ruolo cleaner -> chiave normalizzata (es. "Premium" -> "premium_cleaner")."""
+    hit = _ROLE_MAP.get(role)
+    if hit:
+        return hit
+    return _normalize_cleaner_role_slow(role)
+
+@lru_cache(maxsize=64)
+def _normalize_cleaner_role_slow(role: str) -> str:
+    if not role:
+        return 'standard_cleaner'
+    normalized = role.casefold().strip()
+    # Varianti di maiuscole/spazi dei ruoli noti ("PREMIUM", " Standard ")
+    hit = _ROLE_MAP.get(normalized)
+    if hit:
+        return hit
+    if 'standard' in normalized:
+        return 'standard_cleaner'
+    elif 'premium' in normalized:
+        return 'premium_cleaner'
+    elif 'straord' in normalized:
+        return 'straordinario_cleaner'
+    elif 'formatore' in normalized:
+        return 'formatore_cleaner'
+    return normalized
+
 class TaskValidator:
+    __slots__ = (
+        'rules', 'apartment_types', 'priority_types',
+        '_apartment_perms', '_priority_perms',
+        '_apartment_decisions', '_priority_decisions',
+    )
+
     def __init__(self, settings_path=None):
         settings = load_settings(settings_path)
         self.rules = settings.get('task_types', {})
-        self.apartment_types = settings.get('apartment_types', {})
+        apartment_lists = settings.get('apartment_types', {})
+        # frozenset per membership O(1)
+        self.apartment_types = {k: frozenset(v or ()) for k, v in apartment_lists.items()}
         self.priority_types = settings.get('priority_types', {})
 
-    def _normalize_cleaner_role(self, role: str) -> str:
-        if not role:
-            return 'standard_cleaner'
-        normalized = role.lower().strip()
-        if 'standard' in normalized:
-            return 'standard_cleaner'
-        elif 'premium' in normalized:
-            return 'premium_cleaner'
-        elif 'straord' in normalized:
-            return 'straordinario_cleaner'
-        elif 'formatore' in normalized:
-            return 'formatore_cleaner'
-        return normalized
+        # Tabelle precalcolate: le validazioni vengono chiamate per ogni coppia
+        # (cleaner, task) negli script di assegnazione
+        self._apartment_perms = {
+            role_key: self.apartment_types.get(apt_key, frozenset())
+            for role_key, apt_key in ROLE_APARTMENT_KEYS.items()
+        }
+        self._priority_perms = {
+            (role_key, priority): bool(rules.get(priority, True))
+            for role_key, rules in self.priority_types.items() if rules
+            for priority in PRIORITY_KEYS
+        }
+        # Esiti già calcolati per (ruolo grezzo, tipo appartamento / priorità):
+        # i ruoli arrivano dai cleaners così come sono, il vocabolario è minimo.
+        # Gli script di assegnazione passano il ruolo con sys.intern, così le
+        # chiavi si confrontano per identità prima che per contenuto
+        self._apartment_decisions = {}
+        self._priority_decisions = {}
+
+    # Alias diretto della funzione di modulo (memoizzata): niente frame extra per chiamata
+    _normalize_cleaner_role = staticmethod(normalize_cleaner_role)
 
     def can_cleaner_handle_task(self, cleaner_role: str, task_premium: bool, task_straordinaria: bool, can_do_straordinaria: bool = False) -> bool:
         """
@@ -40,15 +111,14 @@ class TaskValidator:
         - Task premium: solo cleaner con role = "Premium"
         - Task straordinaria: solo cleaner con can_do_straordinaria = True
         """
-        role_key = self._normalize_cleaner_role(cleaner_role)
-        
         # Task straordinaria: solo cleaner con flag can_do_straordinaria
         if task_straordinaria:
             return bool(can_do_straordinaria)
         
         # Task premium: solo cleaner Premium possono gestirla
+        # (il ruolo si normalizza solo qui, le altre task non ne hanno bisogno)
         if task_premium:
-            return role_key == 'premium_cleaner'
+            return self._normalize_cleaner_role(cleaner_role) == 'premium_cleaner'
         
         # Task standard: tutti possono gestirla
         return True
@@ -60,47 +130,36 @@ class TaskValidator:
         """
         if not task_priority:
             return True
-        
-        role_key = self._normalize_cleaner_role(cleaner_role)
-        priority_rules = self.priority_types.get(role_key, {})
-        
-        # Se non ci sono regole per questo ruolo, permetti tutto
-        if not priority_rules:
-            return True
-        
-        # Mappa priorità a chiavi di configurazione
-        priority_map = {
-            'early_out': 'early_out',
-            'high_priority': 'high_priority', 
-            'low_priority': 'low_priority'
-        }
-        
-        priority_key = priority_map.get(task_priority)
-        if not priority_key:
-            return True
-        
-        # Verifica se il cleaner può gestire questa priorità
-        return bool(priority_rules.get(priority_key, True))
+
+        key = (cleaner_role, task_priority)
+        decision = self._priority_decisions.get(key)
+        if decision is None:
+            role_key = self._normalize_cleaner_role(cleaner_role)
+            # Nessuna regola per ruolo/priorità -> permesso
+            decision = self._priority_decisions[key] = self._priority_perms.get((role_key, task_priority), True)
+        return decision
 
     def can_cleaner_handle_apartment(self, cleaner_role: str, apt_type: str) -> bool:
         if not apt_type:
             return True
-        role_key = self._normalize_cleaner_role(cleaner_role)
-        if role_key == 'standard_cleaner':
-            allowed_apts = self.apartment_types.get('standard_apt', [])
-        elif role_key == 'premium_cleaner':
-            allowed_apts = self.apartment_types.get('premium_apt', [])
-        elif role_key == 'straordinario_cleaner':
-            allowed_apts = self.apartment_types.get('straordinario_apt', [])
-        elif role_key == 'formatore_cleaner':
-            allowed_apts = self.apartment_types.get('formatore_apt', [])
-        else:
-            return True
-        return apt_type in allowed_apts
 
+        key = (cleaner_role, apt_type)
+        decision = self._apartment_decisions.get(key)
+        if decision is None:
+            allowed_apts = self._apartment_perms.get(self._normalize_cleaner_role(cleaner_role))
+            decision = self._apartment_decisions[key] = allowed_apts is None or apt_type in allowed_apts
+        return decision
+
+
+# Istanza globale del validator, creata al primo uso: l'import del modulo
+# non deve chiamare l'API settings
+_validator = None
 
-# Istanza globale del validator
-_validator = TaskValidator()
+def get_validator() -> TaskValidator:
+    global _validator
+    if _validator is None:
+        _validator = TaskValidator()
+    return _validator
 
 # Funzioni standalone per l'import negli script di assegnazione
 def can_cleaner_handle_task(cleaner_role: str, task_premium: bool, task_straordinaria: bool, can_do_straordinaria: bool = False) -> bool:
@@ -110,11 +169,11 @@ def can_cleaner_handle_task(cleaner_role: str, task_premium: bool, task_straordi
     - Task premium: solo cleaner con role = "Premium"
     - Task straordinaria: solo cleaner con can_do_straordinaria = True
     """
-    return _validator.can_cleaner_handle_task(cleaner_role, task_premium, task_straordinaria, can_do_straordinaria)
+    return get_validator().can_cleaner_handle_task(cleaner_role, task_premium, task_straordinaria, can_do_straordinaria)
 
 def can_cleaner_handle_priority(cleaner_role: str, priority: str) -> bool:
     """Verifica se un cleaner può gestire una task con una certa priorità (EO/HP/LP)."""
-    return _validator.can_cleaner_handle_priority(cleaner_role, priority)
+    return get_validator().can_cleaner_handle_priority(cleaner_role, priority)
 
 def can_cleaner_handle_apartment(cleaner_role: str, apt_type: str) -> bool:
-    return _validator.can_cleaner_handle_apartment(cleaner_role, apt_type)
+    return get_validator().can_cleaner_handle_apartment(cleaner_role, apt_type)
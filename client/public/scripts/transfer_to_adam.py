@@ -6,7 +6,7 @@ Script per trasferire le assegnazioni della timeline sul database ADAM (wass_hou
 """
 
 import json
-import mysql.connector
+import os
 import sys
 from datetime import datetime
 from pathlib import Path
@@ -14,19 +14,85 @@ from pathlib import Path
 # =============================
 # CONFIG DB
 # =============================
+# Credenziali da ambiente; DB_PASSWORD è obbligatoria (nessun default nel codice)
 DB_CONFIG = {
-    "host": "139.59.132.41",
-    "user": "admin",
-    "password": "ed329a875c6c4ebdf4e87e2bbe53a15771b5844ef6606dde",
-    "database": "adamdb",
+    "host": os.getenv("DB_HOST", "139.59.132.41"),
+    "user": os.getenv("DB_USER", "admin"),
+    "password": os.getenv("DB_PASSWORD"),
+    "database": os.getenv("DB_NAME", "adamdb"),
+    "port": int(os.getenv("DB_PORT", "3306")),
+    "connect_timeout": 10,
+    # Transazione esplicita: un commit per l'intero trasferimento
+    "autocommit": False,
 }
 
+# TIMELINE_VERBOSE=1: una riga per ogni task trasferita (default: solo riepilogo ed errori)
+VERBOSE = os.environ.get("TIMELINE_VERBOSE") == "1"
+
 # =============================
 # PATHS
 # =============================
 BASE = Path(__file__).parent.parent / "data"
 TIMELINE_PATH = BASE / "output" / "timeline.json"
 
+# =============================
+# QUERY
+# =============================
+# Query di update sulla tabella wass_housekeeping
+UPDATE_QUERY = """
+    UPDATE wass_housekeeping 
+    SET 
+      checkout = %s,
+      checkout_time = %s,
+      checkin = %s,
+      checkin_time = %s,
+      checkin_pax = %s,
+      operation_id = %s,
+      cleaned_by_us = %s,
+      sequence = %s,
+      updated_by = %s,
+      updated_at = %s
+    WHERE id = %s
+"""
+# Righe per executemany/commit (un INSERT da 1000 righe è ~80 KB, ben sotto
+# il max_allowed_packet di default di 4 MB)
+UPDATE_BATCH_SIZE = 1000
+
+# Aggiornamento massivo: le assegnazioni vanno in una tabella temporanea
+# (stessi tipi di colonna di wass_housekeeping) e poi un unico UPDATE ... JOIN lato server.
+# Il caricamento usa INSERT: è l'unica forma che il driver riscrive in un
+# INSERT multi-riga con executemany (REPLACE verrebbe eseguito riga per riga)
+UPDATE_COLUMNS = (
+    "checkout", "checkout_time", "checkin", "checkin_time", "checkin_pax",
+    "operation_id", "cleaned_by_us", "sequence", "updated_by", "updated_at",
+)
+CREATE_TMP_QUERY = f"""
+    CREATE TEMPORARY TABLE tmp_assignments (PRIMARY KEY (id))
+    SELECT {", ".join(UPDATE_COLUMNS)}, id FROM wass_housekeeping LIMIT 0
+"""
+# ON DUPLICATE KEY UPDATE: se una task compare due volte nella timeline vince
+# l'ultima, come con gli UPDATE in sequenza
+INSERT_TMP_QUERY = f"""
+    INSERT INTO tmp_assignments ({", ".join(UPDATE_COLUMNS)}, id)
+    VALUES ({", ".join(["%s"] * (len(UPDATE_COLUMNS) + 1))})
+    ON DUPLICATE KEY UPDATE {", ".join(f"{col} = VALUES({col})" for col in UPDATE_COLUMNS)}
+"""
+UPDATE_JOIN_QUERY = f"""
+    UPDATE wass_housekeeping h
+    JOIN tmp_assignments t ON h.id = t.id
+    SET {", ".join(f"h.{col} = t.{col}" for col in UPDATE_COLUMNS)}
+"""
+
+
+def bulk_update(cursor, rows):
+    """UPDATE di tutte le righe: 4 statement + un INSERT multi-riga ogni UPDATE_BATCH_SIZE righe."""
+    cursor.execute("DROP TEMPORARY TABLE IF EXISTS tmp_assignments")
+    cursor.execute(CREATE_TMP_QUERY)
+    for start in range(0, len(rows), UPDATE_BATCH_SIZE):
+        cursor.executemany(INSERT_TMP_QUERY, rows[start:start + UPDATE_BATCH_SIZE])
+    cursor.execute(UPDATE_JOIN_QUERY)
+    cursor.execute("DROP TEMPORARY TABLE tmp_assignments")
+
 
 def transfer_to_adam(work_date: str, username: str = "system"):
     """
@@ -46,7 +112,8 @@ def transfer_to_adam(work_date: str, username: str = "system"):
         }
     
     try:
-        timeline_data = json.loads(TIMELINE_PATH.read_text(encoding="utf-8"))
+        # json.loads accetta bytes e ne rileva da solo la codifica (UTF-8)
+        timeline_data = json.loads(TIMELINE_PATH.read_bytes())
     except Exception as e:
         print(f"❌ Errore lettura timeline: {e}")
         return {
@@ -63,13 +130,19 @@ def transfer_to_adam(work_date: str, username: str = "system"):
             "message": "Nessuna assegnazione trovata"
         }
     
-    # Connessione al database
+    if not DB_CONFIG["password"]:
+        print("❌ Variabile d'ambiente DB_PASSWORD non impostata")
+        return {
+            "success": False,
+            "message": "DB_PASSWORD non impostata"
+        }
+    
+    # Connessione al database (mysql.connector importato solo qui: chi importa
+    # il modulo per altro non paga il costo dell'import del driver)
+    import mysql.connector
+
     try:
-        connection = mysql.connector.connect(
-            **DB_CONFIG,
-            connect_timeout=10,
-            autocommit=False
-        )
+        connection = mysql.connector.connect(**DB_CONFIG)
         cursor = connection.cursor()
         print("✅ Connessione al database stabilita")
     except mysql.connector.Error as e:
@@ -94,6 +167,12 @@ def transfer_to_adam(work_date: str, username: str = "system"):
     print(f"🔄 Trasferimento assegnazioni per {work_date}...")
     
     try:
+        # Raccoglie i parametri di tutte le task, poi un solo UPDATE ... JOIN
+        # (fallback: UPDATE riga per riga a blocchi di UPDATE_BATCH_SIZE, un commit per blocco)
+        rows = []
+        row_tasks = []
+        # Stesso timestamp per tutte le task del trasferimento
+        updated_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         for cleaner_entry in cleaners_assignments:
             cleaner_id = cleaner_entry.get("cleaner", {}).get("id")
             
@@ -104,57 +183,22 @@ def transfer_to_adam(work_date: str, username: str = "system"):
                     if not task_id:
                         continue
                     
-                    # Prepara i dati da salvare
-                    update_data = {
-                        "checkout": task.get("checkout_date"),
-                        "checkout_time": task.get("checkout_time"),
-                        "checkin": task.get("checkin_date"),
-                        "checkin_time": task.get("checkin_time"),
-                        "checkin_pax": task.get("pax_in"),
-                        "operation_id": task.get("operation_id"),
-                        "cleaned_by_us": cleaner_id,
-                        "sequence": task.get("sequence"),
-                        "updated_by": username,
-                        "updated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                    }
-                    
-                    # Query di update sulla tabella wass_housekeeping
-                    query = """
-                        UPDATE wass_housekeeping 
-                        SET 
-                          checkout = %s,
-                          checkout_time = %s,
-                          checkin = %s,
-                          checkin_time = %s,
-                          checkin_pax = %s,
-                          operation_id = %s,
-                          cleaned_by_us = %s,
-                          sequence = %s,
-                          updated_by = %s,
-                          updated_at = %s
-                        WHERE id = %s
-                    """
-                    
+                    # Parametri nell'ordine di UPDATE_COLUMNS, id per ultimo
                     values = (
-                        update_data["checkout"],
-                        update_data["checkout_time"],
-                        update_data["checkin"],
-                        update_data["checkin_time"],
-                        update_data["checkin_pax"],
-                        update_data["operation_id"],
-                        update_data["cleaned_by_us"],
-                        update_data["sequence"],
-                        update_data["updated_by"],
-                        update_data["updated_at"],
+                        task.get("checkout_date"),
+                        task.get("checkout_time"),
+                        task.get("checkin_date"),
+                        task.get("checkin_time"),
+                        task.get("pax_in"),
+                        task.get("operation_id"),
+                        cleaner_id,
+                        task.get("sequence"),
+                        username,
+                        updated_at,
                         task_id
                     )
-                    
-                    cursor.execute(query, values)
-                    connection.commit()
-                    total_updated += 1
-                    
-                    logistic_code = task.get("logistic_code", "N/A")
-                    print(f"✅ Task {logistic_code} (ID: {task_id}) trasferita su ADAM")
+                    rows.append(values)
+                    row_tasks.append(task)
                     
                 except Exception as task_error:
                     total_errors += 1
@@ -162,6 +206,50 @@ def transfer_to_adam(work_date: str, username: str = "system"):
                     errors.append(error_msg)
                     print(f"❌ {error_msg}")
         
+        done = []
+        try:
+            if rows:
+                bulk_update(cursor, rows)
+            connection.commit()
+            done = list(zip(rows, row_tasks))
+        except Exception as bulk_error:
+            connection.rollback()
+            print(f"⚠️ Update massivo non riuscito ({bulk_error}), procedo a blocchi")
+        
+            # Cursore prepared: UPDATE_QUERY viene preparata una volta lato server
+            # e ogni riga invia solo i parametri (COM_STMT_EXECUTE). executemany
+            # di un UPDATE resta comunque un round-trip per riga: solo gli INSERT
+            # del cursore normale diventano multi-riga (vedi bulk_update)
+            update_cursor = connection.cursor(prepared=True)
+            for start in range(0, len(rows), UPDATE_BATCH_SIZE):
+                batch = rows[start:start + UPDATE_BATCH_SIZE]
+                batch_tasks = row_tasks[start:start + UPDATE_BATCH_SIZE]
+                try:
+                    update_cursor.executemany(UPDATE_QUERY, batch)
+                    batch_done = list(zip(batch, batch_tasks))
+                except Exception:
+                    # Blocco fallito: si ripete riga per riga per isolare le task in errore
+                    connection.rollback()
+                    batch_done = []
+                    for values, task in zip(batch, batch_tasks):
+                        try:
+                            update_cursor.execute(UPDATE_QUERY, values)
+                            batch_done.append((values, task))
+                        except Exception as task_error:
+                            total_errors += 1
+                            error_msg = f"Task {task.get('logistic_code', 'N/A')}: {str(task_error)}"
+                            errors.append(error_msg)
+                            print(f"❌ {error_msg}")
+                connection.commit()
+                done.extend(batch_done)
+            update_cursor.close()
+        
+        total_updated += len(done)
+        if VERBOSE:
+            for values, task in done:
+                logistic_code = task.get("logistic_code", "N/A")
+                print(f"✅ Task {logistic_code} (ID: {values[-1]}) trasferita su ADAM")
+        
         print(f"\n✅ Trasferimento completato!")
         print(f"   - Task aggiornate: {total_updated}")
         print(f"   - Errori: {total_errors}")
@@ -0,0 +1,51 @@
+import * as mysql from 'mysql2/promise';
+
+// Composite index for the daily task extraction in create_containers.py:
+// WHERE h.checkout = ? AND h.deleted_at IS NULL AND h.deleted_at_client IS NULL,
+// then JOIN on structure_id and filter on operation_id.
+const INDEX_NAME = 'idx_hk_checkout_active';
+
+async function createHousekeepingIndex() {
+  const connection = await mysql.createConnection({
+    host: process.env.DB_HOST,
+    user: process.env.DB_USER,
+    password: process.env.DB_PASSWORD,
+    database: process.env.DB_NAME,
+    port: parseInt(process.env.DB_PORT || '3306'),
+  });
+  try {
+    console.log(`📝 Creating ${INDEX_NAME} on app_housekeeping (ADAM)...`);
+
+    // MySQL has no CREATE INDEX IF NOT EXISTS
+    const [existing]: any = await connection.query(
+      `SELECT 1 FROM information_schema.statistics
+       WHERE table_schema = DATABASE() AND table_name = 'app_housekeeping' AND index_name = ?
+       LIMIT 1`,
+      [INDEX_NAME]
+    );
+    if (existing.length > 0) {
+      console.log(`✅ Index ${INDEX_NAME} already exists`);
+      return;
+    }
+
+    await connection.query(`
+      CREATE INDEX ${INDEX_NAME}
+      ON app_housekeeping (checkout, deleted_at, deleted_at_client, structure_id, operation_id)
+    `);
+    console.log(`✅ Index ${INDEX_NAME} created successfully`);
+
+    // Verify the task query can use it
+    const [plan]: any = await connection.query(
+      `EXPLAIN SELECT h.id FROM app_housekeeping h
+       WHERE h.checkout = CURDATE() AND h.deleted_at IS NULL AND h.deleted_at_client IS NULL`
+    );
+    console.log('EXPLAIN:', plan.map((r: any) => `${r.table}: key=${r.key} rows=${r.rows}`).join(', '));
+
+  } catch (error) {
+    console.error('Error:', error);
+  } finally {
+    await connection.end();
+  }
+}
+
+createHousekeepingIndex();
@@ -42,6 +42,37 @@ export interface PgDailyAssignmentRow {
   updated_at?: Date;
 }
 
+// Colonne per riga in daily_containers (vedi saveContainers)
+const CONTAINERS_COLUMN_COUNT = 25;
+// 25 colonne x 1000 righe = 25000 parametri, sotto il limite PG di 65535
+const CONTAINERS_INSERT_BATCH_SIZE = 1000;
+
+// Colonne parametriche per riga in cleaners (vedi saveCleanersForDate)
+const CLEANERS_COLUMN_COUNT = 16;
+const CLEANERS_INSERT_BATCH_SIZE = 1000;
+
+// Colonne per riga in daily_assignments_current / _history (vedi saveTimeline, saveToHistory)
+const ASSIGNMENTS_COLUMN_COUNT = 36;
+const HISTORY_COLUMN_COUNT = 38;
+// 38 colonne x 1000 righe = 38000 parametri
+const ASSIGNMENTS_INSERT_BATCH_SIZE = 1000;
+
+/**
+ * Genera "($1, $2, ...), ($n+1, ...)" per un INSERT multi-riga.
+ * `trailing` viene aggiunto in coda a ogni tupla (es. ", NOW(), NOW()").
+ */
+function buildValuesPlaceholders(rowCount: number, columnCount: number, trailing: string = ''): string {
+  const groups: string[] = [];
+  for (let r = 0; r < rowCount; r++) {
+    const params: string[] = [];
+    for (let c = 1; c <= columnCount; c++) {
+      params.push(`$${r * columnCount + c}`);
+    }
+    groups.push(`(${params.join(', ')}${trailing})`);
+  }
+  return groups.join(',\n');
+}
+
 export class PgDailyAssignmentsService {
 
   /**
@@ -186,7 +217,47 @@ export class PgDailyAssignmentsService {
       }
 
       // Insert new rows (includes cleaner data for full reconstruction)
-      for (const row of rows) {
+      // INSERT multi-riga a blocchi: un round-trip per blocco invece che per riga
+      const values = rows.map((row) => [
+        row.work_date,
+        row.cleaner_id,
+        row.cleaner_name,
+        row.cleaner_lastname,
+        row.cleaner_role,
+        row.cleaner_premium,
+        row.cleaner_start_time,
+        row.task_id,
+        row.logistic_code,
+        row.client_id,
+        row.premium,
+        row.address,
+        row.lat,
+        row.lng,
+        row.cleaning_time,
+        row.checkin_date,
+        row.checkout_date,
+        row.checkin_time ? row.checkin_time.substring(0, 5) : null,
+        row.checkout_time ? row.checkout_time.substring(0, 5) : null,
+        row.pax_in,
+        row.pax_out,
+        row.small_equipment,
+        row.operation_id,
+        row.confirmed_operation,
+        row.straordinaria,
+        row.type_apt,
+        row.alias,
+        row.customer_name,
+        row.customer_reference,
+        row.reasons,
+        row.priority,
+        row.start_time,
+        row.end_time,
+        row.followup,
+        row.sequence,
+        row.travel_time,
+      ]);
+      for (let i = 0; i < values.length; i += ASSIGNMENTS_INSERT_BATCH_SIZE) {
+        const batch = values.slice(i, i + ASSIGNMENTS_INSERT_BATCH_SIZE);
         await client.query(`
           INSERT INTO daily_assignments_current (
             work_date, cleaner_id, cleaner_name, cleaner_lastname, cleaner_role, cleaner_premium, cleaner_start_time,
@@ -196,53 +267,8 @@ export class PgDailyAssignmentsService {
             pax_in, pax_out, small_equipment, operation_id, confirmed_operation, straordinaria,
             type_apt, alias, customer_name, customer_reference, reasons, priority,
             start_time, end_time, followup, sequence, travel_time
-          ) VALUES (
-            $1, $2, $3, $4, $5, $6, $7,
-            $8, $9, $10,
-            $11, $12, $13, $14, $15,
-            $16, $17, $18, $19,
-            $20, $21, $22, $23, $24, $25,
-            $26, $27, $28, $29, $30, $31,
-            $32, $33, $34, $35, $36
-          )
-        `, [
-          row.work_date,
-          row.cleaner_id,
-          row.cleaner_name,
-          row.cleaner_lastname,
-          row.cleaner_role,
-          row.cleaner_premium,
-          row.cleaner_start_time,
-          row.task_id,
-          row.logistic_code,
-          row.client_id,
-          row.premium,
-          row.address,
-          row.lat,
-          row.lng,
-          row.cleaning_time,
-          row.checkin_date,
-          row.checkout_date,
-          row.checkin_time ? row.checkin_time.substring(0, 5) : null,
-          row.checkout_time ? row.checkout_time.substring(0, 5) : null,
-          row.pax_in,
-          row.pax_out,
-          row.small_equipment,
-          row.operation_id,
-          row.confirmed_operation,
-          row.straordinaria,
-          row.type_apt,
-          row.alias,
-          row.customer_name,
-          row.customer_reference,
-          row.reasons,
-          row.priority,
-          row.start_time,
-          row.end_time,
-          row.followup,
-          row.sequence,
-          row.travel_time,
-        ]);
+          ) VALUES ${buildValuesPlaceholders(batch.length, ASSIGNMENTS_COLUMN_COUNT)}
+        `, batch.flat());
       }
 
       await client.query('COMMIT');
@@ -470,7 +496,49 @@ export class PgDailyAssignmentsService {
       `, [workDate, revision, rows.length, createdBy, modificationType, editedFields, oldValues, newValues]);
 
       // Insert task rows if any (includes cleaner data for full reconstruction)
-      for (const row of rows) {
+      // INSERT multi-riga a blocchi: un round-trip per blocco invece che per riga
+      const values = rows.map((row) => [
+        row.work_date,
+        revision,
+        row.cleaner_id,
+        row.cleaner_name,
+        row.cleaner_lastname,
+        row.cleaner_role,
+        row.cleaner_premium,
+        row.cleaner_start_time,
+        row.task_id,
+        row.logistic_code,
+        row.client_id,
+        row.premium,
+        row.address,
+        row.lat,
+        row.lng,
+        row.cleaning_time,
+        row.checkin_date,
+        row.checkout_date,
+        row.checkin_time,
+        row.checkout_time,
+        row.pax_in,
+        row.pax_out,
+        row.small_equipment,
+        row.operation_id,
+        row.confirmed_operation,
+        row.straordinaria,
+        row.type_apt,
+        row.alias,
+        row.customer_name,
+        row.customer_reference,
+        row.reasons,
+        row.priority,
+        row.start_time,
+        row.end_time,
+        row.followup,
+        row.sequence,
+        row.travel_time,
+        createdBy,
+      ]);
+      for (let i = 0; i < values.length; i += ASSIGNMENTS_INSERT_BATCH_SIZE) {
+        const batch = values.slice(i, i + ASSIGNMENTS_INSERT_BATCH_SIZE);
         await client.query(`
           INSERT INTO daily_assignments_history (
             work_date, revision, cleaner_id, cleaner_name, cleaner_lastname, cleaner_role, cleaner_premium, cleaner_start_time,
@@ -480,55 +548,8 @@ export class PgDailyAssignmentsService {
             pax_in, pax_out, small_equipment, operation_id, confirmed_operation, straordinaria,
             type_apt, alias, customer_name, customer_reference, reasons, priority,
             start_time, end_time, followup, sequence, travel_time, created_by
-          ) VALUES (
-            $1, $2, $3, $4, $5, $6, $7, $8,
-            $9, $10, $11,
-            $12, $13, $14, $15, $16,
-            $17, $18, $19, $20,
-            $21, $22, $23, $24, $25, $26,
-            $27, $28, $29, $30, $31, $32,
-            $33, $34, $35, $36, $37, $38
-          )
-        `, [
-          row.work_date,
-          revision,
-          row.cleaner_id,
-          row.cleaner_name,
-          row.cleaner_lastname,
-          row.cleaner_role,
-          row.cleaner_premium,
-          row.cleaner_start_time,
-          row.task_id,
-          row.logistic_code,
-          row.client_id,
-          row.premium,
-          row.address,
-          row.lat,
-          row.lng,
-          row.cleaning_time,
-          row.checkin_date,
-          row.checkout_date,
-          row.checkin_time,
-          row.checkout_time,
-          row.pax_in,
-          row.pax_out,
-          row.small_equipment,
-          row.operation_id,
-          row.confirmed_operation,
-          row.straordinaria,
-          row.type_apt,
-          row.alias,
-          row.customer_name,
-          row.customer_reference,
-          row.reasons,
-          row.priority,
-          row.start_time,
-          row.end_time,
-          row.followup,
-          row.sequence,
-          row.travel_time,
-          createdBy,
-        ]);
+          ) VALUES ${buildValuesPlaceholders(batch.length, HISTORY_COLUMN_COUNT)}
+        `, batch.flat());
       }
 
       await client.query('COMMIT');
@@ -768,12 +789,15 @@ export class PgDailyAssignmentsService {
 
     try {
       await client.query('BEGIN');
+      // daily_containers is rebuilt from scratch on every run: don't wait for the
+      // WAL flush on COMMIT (a crash can lose at most the last save)
+      await client.query('SET LOCAL synchronous_commit = off');
 
       // Delete existing containers for this date
       await client.query('DELETE FROM daily_containers WHERE work_date = $1', [workDate]);
 
       const containers = containersData?.containers || {};
-      let totalInserted = 0;
+      const rows: any[][] = [];
 
       // Define priority mappings (support both naming conventions)
       const priorityConfigs = [
@@ -797,19 +821,7 @@ export class PgDailyAssignmentsService {
         for (const task of tasks) {
           if (!task.task_id) continue;
 
-          await client.query(`
-            INSERT INTO daily_containers (
-              work_date, priority,
-              task_id, logistic_code, client_id, premium, address, lat, lng,
-              cleaning_time, checkin_date, checkout_date, checkin_time, checkout_time,
-              pax_in, pax_out, small_equipment, operation_id, confirmed_operation,
-              straordinaria, type_apt, alias, customer_name, reasons, customer_reference
-            ) VALUES (
-              $1, $2, $3, $4, $5, $6, $7, $8, $9,
-              $10, $11, $12, $13, $14, $15, $16, $17, $18, $19,
-              $20, $21, $22, $23, $24, $25
-            )
-          `, [
+          rows.push([
             workDate,
             config.dbName,
             task.task_id,
@@ -836,11 +848,24 @@ export class PgDailyAssignmentsService {
             task.reasons || [],
             task.customer_reference || null
           ]);
-
-          totalInserted++;
         }
       }
 
+      // INSERT multi-riga a blocchi: un round-trip per blocco invece che per task
+      for (let i = 0; i < rows.length; i += CONTAINERS_INSERT_BATCH_SIZE) {
+        const batch = rows.slice(i, i + CONTAINERS_INSERT_BATCH_SIZE);
+        await client.query(`
+          INSERT INTO daily_containers (
+            work_date, priority,
+            task_id, logistic_code, client_id, premium, address, lat, lng,
+            cleaning_time, checkin_date, checkout_date, checkin_time, checkout_time,
+            pax_in, pax_out, small_equipment, operation_id, confirmed_operation,
+            straordinaria, type_apt, alias, customer_name, reasons, customer_reference
+          ) VALUES ${buildValuesPlaceholders(batch.length, CONTAINERS_COLUMN_COUNT)}
+        `, batch.flat());
+      }
+      const totalInserted = rows.length;
+
       await client.query('COMMIT');
       console.log(`✅ PG: Containers salvati per ${workDate} (${totalInserted} task)`);
       return true;
@@ -950,66 +975,43 @@ export class PgDailyAssignmentsService {
       );
       const revision = parseInt(revResult.rows[0]?.next_revision || '1');
 
-      // Get current containers
-      const currentContainers = await client.query(
-        'SELECT * FROM daily_containers WHERE work_date = $1',
+      // Count current containers (the rows themselves are copied server-side below)
+      const countResult = await client.query(
+        'SELECT COUNT(*)::int AS task_count FROM daily_containers WHERE work_date = $1',
         [workDate]
       );
+      const taskCount: number = countResult.rows[0]?.task_count ?? 0;
 
-      console.log(`📜 PG Containers History: Salvando revisione ${revision} con ${currentContainers.rows.length} task per ${workDate}...`);
+      console.log(`📜 PG Containers History: Salvando revisione ${revision} con ${taskCount} task per ${workDate}...`);
 
       // Create revision metadata entry
       await client.query(`
         INSERT INTO daily_containers_revisions (work_date, revision, task_count, created_by, modification_type)
         VALUES ($1, $2, $3, $4, $5)
-      `, [workDate, revision, currentContainers.rows.length, createdBy, modificationType]);
+      `, [workDate, revision, taskCount, createdBy, modificationType]);
 
-      // Copy current containers to history
-      for (const row of currentContainers.rows) {
-        await client.query(`
-          INSERT INTO daily_containers_history (
-            work_date, revision, priority,
-            task_id, logistic_code, client_id, premium, address, lat, lng,
-            cleaning_time, checkin_date, checkout_date, checkin_time, checkout_time,
-            pax_in, pax_out, small_equipment, operation_id, confirmed_operation,
-            straordinaria, type_apt, alias, customer_name, reasons, created_by
-          ) VALUES (
-            $1, $2, $3, $4, $5, $6, $7, $8, $9, $10,
-            $11, $12, $13, $14, $15, $16, $17, $18, $19, $20,
-            $21, $22, $23, $24, $25, $26
-          )
-        `, [
-          workDate,
-          revision,
-          row.priority,
-          row.task_id,
-          row.logistic_code,
-          row.client_id,
-          row.premium,
-          row.address,
-          row.lat,
-          row.lng,
-          row.cleaning_time,
-          row.checkin_date,
-          row.checkout_date,
-          row.checkin_time,
-          row.checkout_time,
-          row.pax_in,
-          row.pax_out,
-          row.small_equipment,
-          row.operation_id,
-          row.confirmed_operation,
-          row.straordinaria,
-          row.type_apt,
-          row.alias,
-          row.customer_name,
-          row.reasons || [],
-          createdBy
-        ]);
-      }
+      // Copy current containers to history: un solo INSERT ... SELECT lato server
+      // invece di un round-trip per task
+      await client.query(`
+        INSERT INTO daily_containers_history (
+          work_date, revision, priority,
+          task_id, logistic_code, client_id, premium, address, lat, lng,
+          cleaning_time, checkin_date, checkout_date, checkin_time, checkout_time,
+          pax_in, pax_out, small_equipment, operation_id, confirmed_operation,
+          straordinaria, type_apt, alias, customer_name, reasons, created_by
+        )
+        SELECT
+          work_date, $2::integer, priority,
+          task_id, logistic_code, client_id, premium, address, lat, lng,
+          cleaning_time, checkin_date, checkout_date, checkin_time, checkout_time,
+          pax_in, pax_out, small_equipment, operation_id, confirmed_operation,
+          straordinaria, type_apt, alias, customer_name, COALESCE(reasons, '{}'), $3::text
+        FROM daily_containers
+        WHERE work_date = $1
+      `, [workDate, revision, createdBy]);
 
       await client.query('COMMIT');
-      console.log(`✅ PG Containers History: Salvata revisione ${revision} con ${currentContainers.rows.length} task`);
+      console.log(`✅ PG Containers History: Salvata revisione ${revision} con ${taskCount} task`);
       return revision;
 
     } catch (error) {
@@ -1113,13 +1115,14 @@ export class PgDailyAssignmentsService {
 
       await client.query('BEGIN');
 
-      // Get containers at the target revision
-      const historyResult = await client.query(
-        'SELECT * FROM daily_containers_history WHERE work_date = $1 AND revision = $2',
+      // Count containers at the target revision (the rows are copied server-side below)
+      const countResult = await client.query(
+        'SELECT COUNT(*)::int AS task_count FROM daily_containers_history WHERE work_date = $1 AND revision = $2',
         [workDate, revision]
       );
+      const taskCount: number = countResult.rows[0]?.task_count ?? 0;
 
-      if (historyResult.rows.length === 0) {
+      if (taskCount === 0) {
         console.log(`⚠️ PG Containers: Nessun dato trovato per revisione ${revision}`);
         await client.query('ROLLBACK');
         return false;
@@ -1128,50 +1131,27 @@ export class PgDailyAssignmentsService {
       // Delete current containers
       await client.query('DELETE FROM daily_containers WHERE work_date = $1', [workDate]);
 
-      // Restore from history
-      for (const row of historyResult.rows) {
-        await client.query(`
-          INSERT INTO daily_containers (
-            work_date, priority,
-            task_id, logistic_code, client_id, premium, address, lat, lng,
-            cleaning_time, checkin_date, checkout_date, checkin_time, checkout_time,
-            pax_in, pax_out, small_equipment, operation_id, confirmed_operation,
-            straordinaria, type_apt, alias, customer_name, reasons
-          ) VALUES (
-            $1, $2, $3, $4, $5, $6, $7, $8, $9,
-            $10, $11, $12, $13, $14, $15, $16, $17, $18, $19,
-            $20, $21, $22, $23, $24
-          )
-        `, [
-          workDate,
-          row.priority,
-          row.task_id,
-          row.logistic_code,
-          row.client_id,
-          row.premium,
-          row.address,
-          row.lat,
-          row.lng,
-          row.cleaning_time,
-          row.checkin_date,
-          row.checkout_date,
-          row.checkin_time,
-          row.checkout_time,
-          row.pax_in,
-          row.pax_out,
-          row.small_equipment,
-          row.operation_id,
-          row.confirmed_operation,
-          row.straordinaria,
-          row.type_apt,
-          row.alias,
-          row.customer_name,
-          row.reasons || []
-        ]);
-      }
+      // Restore from history: un solo INSERT ... SELECT lato server
+      await client.query(`
+        INSERT INTO daily_containers (
+          work_date, priority,
+          task_id, logistic_code, client_id, premium, address, lat, lng,
+          cleaning_time, checkin_date, checkout_date, checkin_time, checkout_time,
+          pax_in, pax_out, small_equipment, operation_id, confirmed_operation,
+          straordinaria, type_apt, alias, customer_name, reasons
+        )
+        SELECT
+          work_date, priority,
+          task_id, logistic_code, client_id, premium, address, lat, lng,
+          cleaning_time, checkin_date, checkout_date, checkin_time, checkout_time,
+          pax_in, pax_out, small_equipment, operation_id, confirmed_operation,
+          straordinaria, type_apt, alias, customer_name, COALESCE(reasons, '{}')
+        FROM daily_containers_history
+        WHERE work_date = $1 AND revision = $2
+      `, [workDate, revision]);
 
       await client.query('COMMIT');
-      console.log(`✅ PG Containers: Ripristinati ${historyResult.rows.length} task dalla revisione ${revision}`);
+      console.log(`✅ PG Containers: Ripristinati ${taskCount} task dalla revisione ${revision}`);
       return true;
 
     } catch (error) {
@@ -1479,27 +1459,18 @@ export class PgDailyAssignmentsService {
       await client.query('DELETE FROM cleaners WHERE work_date = $1', [workDate]);
 
       // Insert new cleaners (alias column kept for backward compat, but read from cleaner_aliases)
+      const newAliases = new Map<number, any[]>();
+      const rows: any[][] = [];
       for (const cleaner of cleaners) {
         // Use alias from cleaner_aliases if exists, otherwise from cleaner object
         const alias = aliasMap.get(cleaner.id) || cleaner.alias || null;
         
         // If cleaner has a new alias, save it to cleaner_aliases (permanent)
         if (cleaner.alias && !aliasMap.has(cleaner.id)) {
-          await client.query(`
-            INSERT INTO cleaner_aliases (cleaner_id, alias, name, lastname, updated_at)
-            VALUES ($1, $2, $3, $4, NOW())
-            ON CONFLICT (cleaner_id) DO UPDATE SET alias = $2, updated_at = NOW()
-          `, [cleaner.id, cleaner.alias, cleaner.name, cleaner.lastname]);
+          newAliases.set(cleaner.id, [cleaner.id, cleaner.alias, cleaner.name, cleaner.lastname]);
         }
         
-        await client.query(`
-          INSERT INTO cleaners 
-          (cleaner_id, work_date, name, lastname, role, active, ranking,
-           counter_hours, counter_days, available, contract_type,
-           preferred_customers, telegram_id, start_time, can_do_straordinaria, alias,
-           created_at, updated_at)
-          VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14, $15, $16, NOW(), NOW())
-        `, [
+        rows.push([
           cleaner.id,
           workDate,
           cleaner.name || '',
@@ -1519,6 +1490,29 @@ export class PgDailyAssignmentsService {
         ]);
       }
 
+      // Upsert alias in un solo statement (Map: un cleaner_id compare una volta sola,
+      // requisito di ON CONFLICT multi-riga)
+      if (newAliases.size > 0) {
+        const aliasRows = Array.from(newAliases.values());
+        await client.query(`
+          INSERT INTO cleaner_aliases (cleaner_id, alias, name, lastname, updated_at)
+          VALUES ${buildValuesPlaceholders(aliasRows.length, 4, ', NOW()')}
+          ON CONFLICT (cleaner_id) DO UPDATE SET alias = EXCLUDED.alias, updated_at = NOW()
+        `, aliasRows.flat());
+      }
+
+      for (let i = 0; i < rows.length; i += CLEANERS_INSERT_BATCH_SIZE) {
+        const batch = rows.slice(i, i + CLEANERS_INSERT_BATCH_SIZE);
+        await client.query(`
+          INSERT INTO cleaners 
+          (cleaner_id, work_date, name, lastname, role, active, ranking,
+           counter_hours, counter_days, available, contract_type,
+           preferred_customers, telegram_id, start_time, can_do_straordinaria, alias,
+           created_at, updated_at)
+          VALUES ${buildValuesPlaceholders(batch.length, CLEANERS_COLUMN_COUNT, ', NOW(), NOW()')}
+        `, batch.flat());
+      }
+
       await client.query('COMMIT');
       console.log(`✅ PG: ${cleaners.length} cleaners salvati per ${workDate}`);
       return true;